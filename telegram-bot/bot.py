@@ -1,10 +1,18 @@
+import io
 import os
+import re
+import math
+import time
 import logging
-import json
+import orjson
 import asyncio
+import functools
 import aiohttp
+from types import MappingProxyType
+from cachetools import TTLCache
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
+from telegram.error import TelegramError
+from telegram.ext import AIORateLimiter, Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
 from dotenv import load_dotenv
 import base58
 
@@ -27,19 +35,121 @@ if logger.disabled:
     logging.disable(logging.INFO)
 
 DEXSCREENER_API = "https://api.dexscreener.com/latest/dex/search"
+DEXSCREENER_TOKENS_API = "https://api.dexscreener.com/latest/dex/tokens"
+BUBBLEMAPS_METADATA_API = "https://api-legacy.bubblemaps.io/map-metadata"
 
-# Create a global aiohttp session
+# Hosts to open keep-alive connections to at startup
+WARMUP_URLS = (
+    "https://api.dexscreener.com",
+    "https://api-legacy.bubblemaps.io",
+    API_URL
+)
+
+# Timeouts for outbound HTTP calls; rendering a bubble map can take a while
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+WARMUP_TIMEOUT = aiohttp.ClientTimeout(total=5)
+IMAGE_TIMEOUT = aiohttp.ClientTimeout(total=60)
+IMAGE_CHUNK_SIZE = 64 * 1024
+ERROR_BODY_LIMIT = 1000
+
+# Outbound Telegram rate limits: stay just under the global 30 msg/s cap,
+# 20 msg/min per group, and retry calls that are answered with RetryAfter
+RATE_LIMITER_MAX_RATE = 28
+RATE_LIMITER_MAX_RETRIES = 3
+
+# Global aiohttp session shared by every handler (keep-alive connection pool)
 session = None
 
+# Use a common token for demonstration (Compound on ETH)
+SAMPLE_TOKEN = '0xc00e94cb662c3520282e6f5717214004a7f26888'
+SAMPLE_REFRESH_INTERVAL = 300
+# Optional chat the sample bubble map is uploaded to once to obtain a file_id
+CACHE_CHAT_ID = os.getenv('TELEGRAM_CACHE_CHAT_ID')
+
+# Prefetched sample token data, refreshed in the background
+sample_token_info = None
+sample_metadata = None
+# The sample's file_id is re-uploaded to the cache chat at most once per
+# SAMPLE_FILE_ID_MAX_AGE seconds; the previous upload is then deleted
+SAMPLE_FILE_ID_MAX_AGE = 3600
+sample_file_id = None
+sample_file_id_time = 0.0
+sample_cache_message_id = None
+sample_refresh_task = None
+
+# Telegram file_id of already uploaded bubble maps, keyed by (chain, address),
+# so repeat requests are sent without rendering or uploading the image again
+BUBBLEMAP_FILEID = TTLCache(maxsize=4096, ttl=600)
+
+# Solana addresses are 32-44 base58 characters, EVM addresses are 0x + 40 hex
+_B58_RE = re.compile(r'[1-9A-HJ-NP-Za-km-z]{32,44}')
+_EVM_RE = re.compile(r'0x[0-9a-fA-F]{40}')
+
 def is_base58(address):
+    # Reject obviously invalid input before paying for a base58 decode
+    if not _B58_RE.fullmatch(address):
+        return False
     try:
-        decoded = base58.b58decode(address)
-        return len(decoded) == 32
-    except Exception:
+        return len(base58.b58decode(address)) == 32
+    except ValueError:
         return False
 
-# Chain mapping from DexScreener to our API
-CHAIN_MAPPING = {
+def is_evm_address(address):
+    return bool(_EVM_RE.fullmatch(address))
+
+def normalize_address(address):
+    """Normalize an address for use as a cache key (EVM addresses are case-insensitive)"""
+    if isinstance(address, str) and address.startswith('0x'):
+        return address.lower()
+    return address
+
+# Sentinel for cache misses, since None is a valid cached value
+_MISSING = object()
+
+def async_ttl_cache(ttl, maxsize=4096):
+    """Cache successful (result, error) responses of an async fetcher for ttl seconds.
+    
+    Concurrent misses for the same key are coalesced: the first caller starts
+    the request and every other caller awaits that same in-flight task.
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        inflight = {}
+        
+        async def fetch(key, args):
+            try:
+                result, error = await func(*args)
+                if error is None:
+                    cache[key] = result
+                return result, error
+            finally:
+                inflight.pop(key, None)
+        
+        @functools.wraps(func)
+        async def wrapper(*args):
+            key = tuple(normalize_address(arg) for arg in args)
+            cached = cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                return cached, None
+            
+            task = inflight.get(key)
+            if task is None:
+                task = asyncio.create_task(fetch(key, args))
+                inflight[key] = task
+            # Shield the shared request so one cancelled caller doesn't cancel it for the rest
+            return await asyncio.shield(task)
+        
+        def cached(*args):
+            """Return the cached result for args without fetching, or None"""
+            return cache.get(tuple(normalize_address(arg) for arg in args))
+        
+        wrapper.cache = cache
+        wrapper.cached = cached
+        return wrapper
+    return decorator
+
+# Chain mapping from DexScreener to our API (keys are lowercase, read-only)
+CHAIN_MAPPING = MappingProxyType({
     "ethereum": "eth",
     "bsc": "bsc", 
     "fantom": "ftm",
@@ -50,13 +160,108 @@ CHAIN_MAPPING = {
     "base": "base",
     "solana": "sol",
     "sonic": "sonic"
-}
+})
+
+# Static reply texts and keyboards, built once instead of on every update
+START_TEXT = (
+    'Welcome to BubbleMap Bot! 🌐\n\n'
+    'I can generate bubble map visualizations for any token.\n\n'
+    'Use the command: /bubblemap to start an interactive process.\n\n'
+    'Supported chains: eth, bsc, ftm, avax, cro, arbi, poly, base, sol, sonic'
+)
+
+HELP_TEXT = (
+    'BubbleMap Bot Commands:\n\n'
+    '/start - Start the bot\n'
+    '/help - Show this help message\n'
+    '/menu - Show command menu\n'
+    '/bubblemap - Generate a bubble map visualization (interactive)\n\n'
+    'To generate a bubble map, simply type /bubblemap and follow the prompts.\n'
+    'You can also specify token directly: /bubblemap <token_address>'
+)
+
+MENU_TEXT = 'BubbleMap Bot Menu 📋'
+
+COMMANDS_TEXT = (
+    'Available Commands:\n\n'
+    '/start - Start the bot and show this menu\n'
+    '/help - Show help information\n'
+    '/menu - Show this command menu\n'
+    '/bubblemap - Generate a bubble map (interactive)\n\n'
+    'To generate a bubble map, simply type /bubblemap and follow the prompts.'
+)
+
+CHAINS_TEXT = (
+    'Supported Blockchain Networks:\n\n'
+    '• eth - Ethereum\n'
+    '• bsc - Binance Smart Chain\n'
+    '• ftm - Fantom\n'
+    '• avax - Avalanche\n'
+    '• cro - Cronos\n'
+    '• arbi - Arbitrum\n'
+    '• poly - Polygon\n'
+    '• base - Base\n'
+    '• sol - Solana\n'
+    '• sonic - Sonic\n\n'
+)
+
+HELP_CALLBACK_TEXT = (
+    'BubbleMap Bot Help 🌐\n\n'
+    'This bot generates visual representations of token holder distributions.\n\n'
+    'To use the bot, send the command:\n'
+    '/bubblemap\n\n'
+    'Then enter the token contract address when prompted.\n'
+    'The bot will automatically detect the chain and show token information.\n\n'
+    'You can also use the menu to see available commands and options.'
+)
+
+HELP_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📋 Show Menu", callback_data='show_commands')]
+])
+
+COMMANDS_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🔍 Sample Map", callback_data='sample_bubblemap'),
+        InlineKeyboardButton("🔗 Supported Chains", callback_data='show_chains')
+    ]
+])
+
+HELP_CALLBACK_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📋 Show Commands", callback_data='show_commands'),
+        InlineKeyboardButton("🔗 Supported Chains", callback_data='show_chains')
+    ]
+])
+
+# Keyboards with the "Add to Group" link depend on the bot username and are built in post_init
+GROUP_URL = None
+START_MARKUP = None
+MENU_MARKUP = None
+
+async def warm_connection(url):
+    """Open a pooled connection to url so the first real request skips the handshake"""
+    global session
+    try:
+        async with session.head(url, timeout=WARMUP_TIMEOUT):
+            pass
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"Could not warm up connection to {url}: {e}")
 
 async def post_init(application: Application) -> None:
     """Set up bot commands after initialization"""
     global session
-    # Create a global aiohttp session
-    session = aiohttp.ClientSession()
+    # Create a global aiohttp session; connections (and DNS lookups) are kept
+    # alive between requests so only the first call to a host pays for TCP+TLS
+    session = aiohttp.ClientSession(
+        timeout=HTTP_TIMEOUT,
+        connector=aiohttp.TCPConnector(
+            limit=128,
+            limit_per_host=32,
+            keepalive_timeout=60,
+            ttl_dns_cache=300
+        )
+    )
+    await asyncio.gather(*(warm_connection(url) for url in WARMUP_URLS))
     
     await application.bot.set_my_commands([
         ("start", "Start the bot"),
@@ -64,227 +269,274 @@ async def post_init(application: Application) -> None:
         ("menu", "Show command menu"),
         ("bubblemap", "Generate a bubble map visualization")
     ])
-
-# Define command handlers
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Send a message when the command /start is issued."""
-    # Store user_id in user_data
-    context.user_data['user_id'] = update.effective_user.id
     
-    keyboard = [
+    # Build the keyboards that link to adding the bot to a group
+    global GROUP_URL, START_MARKUP, MENU_MARKUP
+    GROUP_URL = f"https://t.me/{application.bot.username}?startgroup=true"
+    START_MARKUP = InlineKeyboardMarkup([
         [
             InlineKeyboardButton("📋 Show Commands", callback_data='show_commands'),
             InlineKeyboardButton("🔍 Sample Bubblemap", callback_data='sample_bubblemap')
         ],
         [
             InlineKeyboardButton("ℹ️ Help", callback_data='help'),
-            InlineKeyboardButton("➕ Add to Group", url=f"https://t.me/{context.bot.username}?startgroup=true")
+            InlineKeyboardButton("➕ Add to Group", url=GROUP_URL)
         ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
-        'Welcome to BubbleMap Bot! 🌐\n\n'
-        'I can generate bubble map visualizations for any token.\n\n'
-        'Use the command: /bubblemap to start an interactive process.\n\n'
-        'Supported chains: eth, bsc, ftm, avax, cro, arbi, poly, base, sol, sonic',
-        reply_markup=reply_markup
-    )
+    ])
+    MENU_MARKUP = InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("📋 Show Commands", callback_data='show_commands'),
+            InlineKeyboardButton("🔍 Sample Map", callback_data='sample_bubblemap')
+        ],
+        [
+            InlineKeyboardButton("🔗 Supported Chains", callback_data='show_chains'),
+            InlineKeyboardButton("ℹ️ Help", callback_data='help')
+        ],
+        [
+            InlineKeyboardButton("➕ Add to Group", url=GROUP_URL)
+        ]
+    ])
+    
+    # Keep the sample bubble map warm so the sample button is served from memory
+    global sample_refresh_task
+    sample_refresh_task = asyncio.create_task(sample_refresh_loop(application))
+
+# Define command handlers
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Send a message when the command /start is issued."""
+    # Store user_id in user_data
+    context.user_data['user_id'] = update.effective_user.id
+    
+    await update.message.reply_text(START_TEXT, reply_markup=START_MARKUP)
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /help is issued."""
     # Store user_id in user_data
     context.user_data['user_id'] = update.effective_user.id
     
-    keyboard = [
-        [InlineKeyboardButton("📋 Show Menu", callback_data='show_commands')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        'BubbleMap Bot Commands:\n\n'
-        '/start - Start the bot\n'
-        '/help - Show this help message\n'
-        '/menu - Show command menu\n'
-        '/bubblemap - Generate a bubble map visualization (interactive)\n\n'
-        'To generate a bubble map, simply type /bubblemap and follow the prompts.\n'
-        'You can also specify token directly: /bubblemap <token_address>',
-        reply_markup=reply_markup
-    )
+    await update.message.reply_text(HELP_TEXT, reply_markup=HELP_MARKUP)
 
 async def menu_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send the command menu."""
     # Store user_id in user_data
     context.user_data['user_id'] = update.effective_user.id
     
-    keyboard = [
-        [
-            InlineKeyboardButton("📋 Show Commands", callback_data='show_commands'),
-            InlineKeyboardButton("🔍 Sample Map", callback_data='sample_bubblemap')
-        ],
-        [
-            InlineKeyboardButton("🔗 Supported Chains", callback_data='show_chains'),
-            InlineKeyboardButton("ℹ️ Help", callback_data='help')
-        ],
-        [
-            InlineKeyboardButton("➕ Add to Group", url=f"https://t.me/{context.bot.username}?startgroup=true")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        'BubbleMap Bot Menu 📋',
-        reply_markup=reply_markup
-    )
+    await update.message.reply_text(MENU_TEXT, reply_markup=MENU_MARKUP)
+
+def _pair_volume_h24(pair):
+    """Return a DexScreener pair's 24h volume as a float (0.0 if missing or invalid)"""
+    try:
+        return float(pair['volume']['h24'])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+async def fetch_dexscreener_pairs(url):
+    """Fetch the list of pairs returned by a DexScreener endpoint"""
+    global session
+    async with session.get(url) as response:
+        response.raise_for_status()
+        data = orjson.loads(await response.read())
+    return data.get('pairs') or []
 
+# Price data moves quickly, so DexScreener responses are only cached briefly
+@async_ttl_cache(ttl=30)
 async def get_token_info(token_address):
     """Get token information from DexScreener API asynchronously"""
-    global session
     try:
-        async with session.get(f"{DEXSCREENER_API}?q={token_address}") as response:
-            response.raise_for_status()
-            data = await response.json()
-            
-            if not data.get('pairs') or len(data['pairs']) == 0:
-                return None, "No token information found. Please verify the contract address."
-            
-            # Find pair with highest volume
-            pairs = data['pairs']
-            highest_volume_pair = None
-            highest_volume = 0
-            
-            for pair in pairs:
-                # Check if volume data exists and has h24 field
-                if 'volume' in pair and 'h24' in pair['volume']:
-                    volume_h24 = pair['volume']['h24']
-                    if volume_h24 > highest_volume:
-                        highest_volume = volume_h24
-                        highest_volume_pair = pair
-            
-            # If no pair with volume found, fall back to first pair
-            pair = highest_volume_pair if highest_volume_pair else pairs[0]
-            
-            # Extract chain ID and convert to our format
-            chain_id = pair.get('chainId', '').lower()
-            our_chain = CHAIN_MAPPING.get(chain_id)
-            
-            if not our_chain:
-                return None, f"Chain {chain_id} not supported for bubble maps."
-            
-            # Get token info
-            base_token = pair.get('baseToken', {})
-            token_name = base_token.get('name', 'Unknown')
-            token_symbol = base_token.get('symbol', 'Unknown')
-            
-            # Price info
-            price_usd = pair.get('priceUsd', 'Unknown')
-            price_native = pair.get('priceNative', 'Unknown')
-            
-            # Liquidity
-            liquidity = pair.get('liquidity', {})
-            liquidity_usd = liquidity.get('usd', 'Unknown')
-            
-            # Market cap and FDV
-            market_cap = pair.get('marketCap', 'Unknown')
-            fdv = pair.get('fdv', 'Unknown')
-            
-            # Volume data
-            volume_h24 = highest_volume if highest_volume > 0 else 'Unknown'
-            
-            # Format token info message
-            token_info = {
-                'address': token_address,
-                'name': token_name,
-                'symbol': token_symbol,
-                'chain': our_chain,
-                'chain_original': chain_id,
-                'price_usd': price_usd,
-                'price_native': price_native,
-                'liquidity_usd': liquidity_usd,
-                'market_cap': market_cap,
-                'fdv': fdv,
-                'volume_h24': volume_h24,
-                'pair_address': pair.get('pairAddress', 'Unknown'),
-                'dex': pair.get('dexId', 'Unknown')
-            }
-            
-            return token_info, None
+        # The token endpoint only returns pairs for this token; fall back to
+        # search if it knows nothing about the address
+        pairs = await fetch_dexscreener_pairs(f"{DEXSCREENER_TOKENS_API}/{token_address}")
+        if not pairs:
+            pairs = await fetch_dexscreener_pairs(f"{DEXSCREENER_API}?q={token_address}")
+        
+        if not pairs:
+            return None, "No token information found. Please verify the contract address."
+        
+        # Find pair with highest volume; max() keeps the first pair when
+        # no pair reports any volume
+        pair = max(pairs, key=_pair_volume_h24, default=pairs[0])
+        
+        # Extract chain ID and convert to our format
+        # (DexScreener chain IDs are already lowercase, so only lowercase on a miss)
+        chain_id = pair.get('chainId') or ''
+        our_chain = CHAIN_MAPPING.get(chain_id) or CHAIN_MAPPING.get(chain_id.lower())
+        if not our_chain:
+            return None, f"Chain {chain_id} not supported for bubble maps."
+        
+        # Get token info; missing fields are None
+        base_token = pair.get('baseToken') or {}
+        liquidity = pair.get('liquidity') or {}
+        
+        # Format token info message
+        token_info = {
+            'address': token_address,
+            'name': base_token.get('name'),
+            'symbol': base_token.get('symbol'),
+            'chain': our_chain,
+            'chain_original': chain_id,
+            'price_usd': pair.get('priceUsd'),
+            'price_native': pair.get('priceNative'),
+            'liquidity_usd': liquidity.get('usd'),
+            'market_cap': pair.get('marketCap'),
+            'fdv': pair.get('fdv'),
+            # Volume data (0 means no pair reported any)
+            'volume_h24': _pair_volume_h24(pair) or None,
+            'pair_address': pair.get('pairAddress'),
+            'dex': pair.get('dexId')
+        }
+        
+        return token_info, None
     except Exception as e:
         logger.error(f"Error fetching token info: {e}")
         return None, f"Error fetching token info: {str(e)}"
 
-# Function to fetch bubble map metadata
+# Function to fetch bubble map metadata (decentralisation score changes slowly)
+@async_ttl_cache(ttl=300)
 async def get_bubblemap_metadata(chain, token_address):
     """Get bubble map metadata from Bubblemaps API asynchronously"""
     global session
     try:
-        url = f"https://api-legacy.bubblemaps.io/map-metadata?chain={chain}&token={token_address}"
+        url = f"{BUBBLEMAPS_METADATA_API}?chain={chain}&token={token_address}"
         async with session.get(url) as response:
             response.raise_for_status()
-            data = await response.json()
+            data = orjson.loads(await response.read())
             return data, None
     except Exception as e:
         logger.error(f"Error fetching bubble map metadata: {e}")
         return None, f"Error fetching bubble map metadata: {str(e)}"
 
-async def format_token_info_message(token_info):
-    """Format token information into a readable message"""
-    message = f"*{token_info['name']} ({token_info['symbol']})*\n\n"
-    message += f"🔗 *Chain:* {token_info['chain_original'].upper()}\n"
-    message += f"📝 *Contract:* `{token_info['address']}`\n"
-    
-    # Price information
-    message += f"💰 *Price:* ${token_info['price_usd']}\n"
+async def fetch_bubblemap_image(chain, token_address):
+    """Fetch the rendered bubble map PNG from our API asynchronously as a file-like object"""
+    global session
+    request_url = f"{API_URL}/bubble-map?token={token_address}&chain={chain}"
+    logger.info(f"Making request to: {request_url}")
+    
+    # Stream the body into a single buffer instead of buffering it twice
+    image_data = io.BytesIO()
+    async with session.get(request_url, timeout=IMAGE_TIMEOUT) as response:
+        if response.status >= 400:
+            # Keep (the start of) the response body so the handlers can show the
+            # API's error; never fail on bodies that aren't valid text
+            error_body = await response.text(errors='replace')
+            raise aiohttp.ClientResponseError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message=error_body[:ERROR_BODY_LIMIT],
+                headers=response.headers
+            )
+        async for chunk in response.content.iter_chunked(IMAGE_CHUNK_SIZE):
+            image_data.write(chunk)
+    image_data.seek(0)
+    
+    logger.info(f"API response received, status: {response.status}")
+    return image_data
+
+# User-friendly wording for known bubble map API errors, matched by substring
+_ERROR_MESSAGES = (
+    ("Map not computed. API key required", "No bubble map data available for this token."),
+    ("Token not found", "Token not found on {chain}."),
+)
+
+def map_error(error_text, chain):
+    """Translate a bubble map API error into a user-friendly message"""
+    for needle, message in _ERROR_MESSAGES:
+        if needle in error_text:
+            return message.format(chain=chain)
+    return error_text
+
+def extract_error(e, chain, default):
+    """Build the error message shown when a bubble map could not be generated"""
+    if isinstance(e, aiohttp.ClientResponseError) and e.message:
+        try:
+            error_json = orjson.loads(e.message)
+            if isinstance(error_json, dict) and 'error' in error_json:
+                return f"{map_error(str(error_json['error']), chain)}\n\n"
+        except orjson.JSONDecodeError:
+            if len(e.message) < 200:
+                return f"{e.message}\n\n"
+    return default
+
+def discard_task(task):
+    """Drop a task whose result is no longer needed without losing track of it"""
+    if task is None:
+        return
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        # Retrieve the exception so it isn't reported as never retrieved
+        task.exception()
+
+def bubblemap_reply_markup(chain, token_address):
+    """Create the button linking a token to the BubbleMaps website"""
+    bubblemap_url = f"https://app.bubblemaps.io/{chain}/token/{token_address}"
+    keyboard = [[InlineKeyboardButton("🔍 Check on BubbleMaps", url=bubblemap_url)]]
+    return InlineKeyboardMarkup(keyboard)
+
+def format_token_info_message(token_info, metadata=None):
+    """Format token information and optional BubbleMap metadata into a readable message"""
+    # Look up each field once
+    volume_h24 = token_info['volume_h24']
+    liquidity_usd = token_info['liquidity_usd']
+    market_cap = token_info['market_cap']
+    fdv = token_info['fdv']
+    
+    parts = [
+        f"*{token_info['name'] or 'Unknown'} ({token_info['symbol'] or 'Unknown'})*",
+        "",
+        f"🔗 *Chain:* {token_info['chain_original'].upper()}",
+        f"📝 *Contract:* `{token_info['address']}`",
+        # Price information
+        f"💰 *Price:* ${token_info['price_usd'] or 'Unknown'}"
+    ]
     
     # Add volume information
-    if token_info['volume_h24'] != 'Unknown':
-        message += f"📊 *24h Volume:* ${format_number(token_info['volume_h24'])}\n"
+    if volume_h24 is not None:
+        parts.append(f"📊 *24h Volume:* ${format_number(volume_h24)}")
     
     # Add market metrics if available
-    if token_info['liquidity_usd'] != 'Unknown':
-        message += f"💧 *Liquidity:* ${format_number(token_info['liquidity_usd'])}\n"
+    if liquidity_usd is not None:
+        parts.append(f"💧 *Liquidity:* ${format_number(liquidity_usd)}")
     
-    if token_info['market_cap'] != 'Unknown':
-        message += f"📈 *Market Cap:* ${format_number(token_info['market_cap'])}\n"
+    if market_cap is not None:
+        parts.append(f"📈 *Market Cap:* ${format_number(market_cap)}")
         
-    if token_info['fdv'] != 'Unknown':
-        message += f"🌐 *FDV:* ${format_number(token_info['fdv'])}\n"
-    
-    # Fetch and add BubbleMap metadata if available
-    metadata, error = await get_bubblemap_metadata(token_info['chain'], token_info['address'])
-    if metadata and not error:
-        message += "\n*BubbleMap Metrics:*\n"
-        if 'decentralisation_score' in metadata:
-            message += f"🏆 *Decentralization Score:* {metadata['decentralisation_score']:.2f}/100\n"
+    if fdv is not None:
+        parts.append(f"🌐 *FDV:* ${format_number(fdv)}")
+    
+    # Add BubbleMap metadata if available
+    if metadata:
+        parts += ("", "*BubbleMap Metrics:*")
+        decentralisation_score = metadata.get('decentralisation_score')
+        if decentralisation_score is not None:
+            parts.append(f"🏆 *Decentralization Score:* {decentralisation_score:.2f}/100")
         
-        if 'identified_supply' in metadata:
-            identified_supply = metadata['identified_supply']
-            if 'percent_in_cexs' in identified_supply:
-                message += f"📊 *% in CEXs:* {identified_supply['percent_in_cexs']:.2f}%\n"
-            if 'percent_in_contracts' in identified_supply:
-                message += f"📝 *% in Contracts:* {identified_supply['percent_in_contracts']:.2f}%\n"
-    
-    return message
+        identified_supply = metadata.get('identified_supply')
+        if identified_supply:
+            percent_in_cexs = identified_supply.get('percent_in_cexs')
+            if percent_in_cexs is not None:
+                parts.append(f"📊 *% in CEXs:* {percent_in_cexs:.2f}%")
+            percent_in_contracts = identified_supply.get('percent_in_contracts')
+            if percent_in_contracts is not None:
+                parts.append(f"📝 *% in Contracts:* {percent_in_contracts:.2f}%")
+    
+    return "\n".join(parts) + "\n"
+
+# Magnitude suffixes indexed by int(log10(number)) // 3
+_NUMBER_SUFFIXES = (("", 1.0), ("K", 1e3), ("M", 1e6), ("B", 1e9), ("T", 1e12))
 
 def format_number(number):
     """Format large numbers to be more readable"""
-    if isinstance(number, str):
-        try:
-            number = float(number)
-        except:
-            return number
-            
-    if number is None:
-        return "Unknown"
-    if number >= 1_000_000_000_000:
-        return f"{number / 1_000_000_000_000:.2f}T"
-    elif number >= 1_000_000_000:
-        return f"{number / 1_000_000_000:.2f}B"
-    elif number >= 1_000_000:
-        return f"{number / 1_000_000:.2f}M"
-    elif number >= 1_000:
-        return f"{number / 1_000:.2f}K"
-    else:
-        return f"{number:.2f}"
+    try:
+        value = float(number)
+    except (TypeError, ValueError):
+        return "Unknown" if number is None else number
+    
+    index = 0
+    if value >= 1 and math.isfinite(value):
+        index = min(len(_NUMBER_SUFFIXES) - 1, int(math.log10(value)) // 3)
+    suffix, divisor = _NUMBER_SUFFIXES[index]
+    return f"{value / divisor:.2f}{suffix}"
 
 async def bubblemap_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Generate a bubble map visualization based on the given token address."""
@@ -311,116 +563,129 @@ async def bubblemap_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     token_address = args[0]
     
     # Process the token address
-    asyncio.create_task(process_token_address(update, context, token_address))
+    context.application.create_task(process_token_address(update, context, token_address), update=update)
     
     # Immediately return to allow the bot to handle other requests
     return
 
-async def process_token_address(update: Update, context: ContextTypes.DEFAULT_TYPE, token_address: str) -> None:
-    """Process a token address by fetching info and generating bubblemap"""
-    # Get user_id for proper state tracking
-    user_id = update.effective_user.id
-
-    # Basic validation of contract address format
-    if not (token_address.startswith('0x') and len(token_address) >= 40) and not is_base58(token_address):
-        await update.message.reply_text(
-            'Invalid token address format. Please provide a valid CA.'
+async def send_bubblemap(context: ContextTypes.DEFAULT_TYPE, chat_id, token_address, send_status,
+                         token_info=None, reply_to_message_id=None, label="bubble map") -> None:
+    """Fetch token info and send the bubble map for a token to a chat.
+    
+    send_status(text) sends a status message and returns it; status messages
+    are only sent while something still has to be fetched or rendered.
+    """
+    # Skip the status messages entirely when the token info is already cached
+    if token_info is None:
+        token_info = get_token_info.cached(token_address)
+    status_message, error = None, None
+    
+    if token_info is None:
+        # Send status message while fetching token information concurrently
+        status_message, (token_info, error) = await asyncio.gather(
+            send_status('Fetching token information...'),
+            get_token_info(token_address)
         )
-        return
-    
-    # Send status message
-    status_message = await update.message.reply_text('Fetching token information...')
-    
-    # Get token information asynchronously
-    token_info, error = await get_token_info(token_address)
     
     if error:
         await context.bot.edit_message_text(
-            chat_id=update.effective_chat.id,
+            chat_id=chat_id,
             message_id=status_message.message_id,
             text=error
         )
         return
     
-    # Format token info message
-    token_info_message = await format_token_info_message(token_info)
+    # Get chain from token info
+    chain = token_info['chain']
     
-    # Update status message to indicate bubble map generation
-    await context.bot.edit_message_text(
-        chat_id=update.effective_chat.id,
-        message_id=status_message.message_id,
-        text="Generating bubble map visualization..."
-    )
+    # Reuse the previously uploaded bubble map if Telegram already has it
+    file_id_key = (chain, normalize_address(token_address))
+    cached_file_id = BUBBLEMAP_FILEID.get(file_id_key)
+    
+    # Fetch BubbleMap metadata and the bubble map image concurrently
+    metadata_task = asyncio.create_task(get_bubblemap_metadata(chain, token_address))
+    image_task = None
+    if not cached_file_id:
+        image_task = asyncio.create_task(fetch_bubblemap_image(chain, token_address))
     
     try:
-        # Get chain from token info
-        chain = token_info['chain']
-        
-        # Request URL
-        request_url = f"{API_URL}/bubble-map?token={token_address}&chain={chain}"
-        logger.info(f"Making request to: {request_url}")
-        
-        # Make request to API asynchronously
-        global session
-        async with session.get(request_url) as response:
-            response.raise_for_status()
-            image_data = await response.read()
-        
-        logger.info(f"API response received, status: {response.status}")
-        
-        # Create button to link to BubbleMaps website
-        bubblemap_url = f"https://app.bubblemaps.io/{chain}/token/{token_address}"
-        keyboard = [[InlineKeyboardButton("🔍 Check on BubbleMaps", url=bubblemap_url)]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        # Format token info message
+        metadata, _ = await metadata_task
+        token_info_message = format_token_info_message(token_info, metadata)
+    
+        # Only report progress when the bubble map still has to be generated
+        if not cached_file_id:
+            if status_message is None:
+                status_message = await send_status(f"Generating {label} visualization...")
+            else:
+                await context.bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=status_message.message_id,
+                    text=f"Generating {label} visualization..."
+                )
+    except BaseException:
+        # Don't leave the render running, or its failure unretrieved, if we bail out early
+        discard_task(image_task)
+        raise
+    
+    try:
+        photo = cached_file_id or await image_task
         
         # Send image to user with token info caption
-        await context.bot.send_photo(
-            chat_id=update.effective_chat.id,
-            photo=image_data,
+        photo_message = await context.bot.send_photo(
+            chat_id=chat_id,
+            photo=photo,
             caption=token_info_message,
             parse_mode="Markdown",
-            reply_to_message_id=update.message.message_id,
-            reply_markup=reply_markup
+            reply_to_message_id=reply_to_message_id,
+            reply_markup=bubblemap_reply_markup(chain, token_address)
         )
+        if not cached_file_id:
+            BUBBLEMAP_FILEID[file_id_key] = photo_message.photo[-1].file_id
         
         logger.info("Photo sent to user")
         
         # Delete status message
-        await context.bot.delete_message(
-            chat_id=update.effective_chat.id,
-            message_id=status_message.message_id
-        )
+        if status_message:
+            await context.bot.delete_message(
+                chat_id=chat_id,
+                message_id=status_message.message_id
+            )
         
-    except aiohttp.ClientError as e:
-        logger.error(f"Error generating bubble map: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Error generating {label}: {e}")
         
         # Extract error message from response
-        error_message = 'Error generating bubble map.\n\n'
-        
-        if hasattr(e, 'status') and e.status is not None:
-            try:
-                error_text = await e.text()
-                error_json = json.loads(error_text)
-                if 'error' in error_json:
-                    # Make error messages more user-friendly
-                    if "Map not computed. API key required" in error_json['error']:
-                        error_message = f"No bubble map data available for this token.\n\n"
-                    elif "Token not found" in error_json['error']:
-                        error_message = f"Token not found on {chain}.\n\n"
-                    else:
-                        error_message = f"{error_json['error']}\n\n"
-            except (ValueError, KeyError, json.JSONDecodeError):
-                if hasattr(e, 'text') and len(e.text) < 200:
-                    error_message = f"{e.text}\n\n"
+        error_message = extract_error(e, chain, f"Error generating {label}.\n\n")
         
         # If bubble map couldn't be generated, send token info
         await context.bot.edit_message_text(
-            chat_id=update.effective_chat.id,
+            chat_id=chat_id,
             message_id=status_message.message_id,
             text=f"{error_message}{token_info_message}",
             parse_mode="Markdown"
         )
 
+async def process_token_address(update: Update, context: ContextTypes.DEFAULT_TYPE, token_address: str) -> None:
+    """Process a token address by fetching info and generating bubblemap"""
+    # Get user_id for proper state tracking
+    user_id = update.effective_user.id
+
+    # Basic validation of contract address format
+    if not is_evm_address(token_address) and not is_base58(token_address):
+        await update.message.reply_text(
+            'Invalid token address format. Please provide a valid CA.'
+        )
+        return
+    
+    await send_bubblemap(
+        context,
+        update.effective_chat.id,
+        token_address,
+        send_status=update.message.reply_text,
+        reply_to_message_id=update.message.message_id
+    )
+
 # Add handler for text messages to capture token addresses
 async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle text input for the interactive bubblemap flow"""
@@ -441,7 +706,7 @@ async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
             context.user_data.pop('waiting_for', None)
             
             # Process the token address asynchronously
-            asyncio.create_task(process_token_address(update, context, token_address))
+            context.application.create_task(process_token_address(update, context, token_address), update=update)
             return
     
     # If not waiting for specific input, use the default unknown text handler
@@ -461,164 +726,142 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     context.user_data['user_id'] = user_id
     
     if query.data == 'show_commands':
-        keyboard = [
-            [
-                InlineKeyboardButton("🔍 Sample Map", callback_data='sample_bubblemap'),
-                InlineKeyboardButton("🔗 Supported Chains", callback_data='show_chains')
-            ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
-            text='Available Commands:\n\n'
-                 '/start - Start the bot and show this menu\n'
-                 '/help - Show help information\n'
-                 '/menu - Show this command menu\n'
-                 '/bubblemap - Generate a bubble map (interactive)\n\n'
-                 'To generate a bubble map, simply type /bubblemap and follow the prompts.',
-            reply_markup=reply_markup
-        )
+        await query.edit_message_text(text=COMMANDS_TEXT, reply_markup=COMMANDS_MARKUP)
     
     elif query.data == 'sample_bubblemap':
         # Launch in a separate task to avoid blocking
-        asyncio.create_task(handle_sample_bubblemap(update, context))
+        context.application.create_task(handle_sample_bubblemap(update, context), update=update)
     
     elif query.data == 'show_chains':
-        await query.edit_message_text(
-            text='Supported Blockchain Networks:\n\n'
-                 '• eth - Ethereum\n'
-                 '• bsc - Binance Smart Chain\n'
-                 '• ftm - Fantom\n'
-                 '• avax - Avalanche\n'
-                 '• cro - Cronos\n'
-                 '• arbi - Arbitrum\n'
-                 '• poly - Polygon\n'
-                 '• base - Base\n'
-                 '• sol - Solana\n'
-                 '• sonic - Sonic\n\n'
-        )
+        await query.edit_message_text(text=CHAINS_TEXT)
     
     elif query.data == 'help':
-        keyboard = [
-            [
-                InlineKeyboardButton("📋 Show Commands", callback_data='show_commands'),
-                InlineKeyboardButton("🔗 Supported Chains", callback_data='show_chains')
-            ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
-            text='BubbleMap Bot Help 🌐\n\n'
-                 'This bot generates visual representations of token holder distributions.\n\n'
-                 'To use the bot, send the command:\n'
-                 '/bubblemap\n\n'
-                 'Then enter the token contract address when prompted.\n'
-                 'The bot will automatically detect the chain and show token information.\n\n'
-                 'You can also use the menu to see available commands and options.',
-            reply_markup=reply_markup
-        )
+        await query.edit_message_text(text=HELP_CALLBACK_TEXT, reply_markup=HELP_CALLBACK_MARKUP)
 
 async def handle_sample_bubblemap(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the sample bubblemap button press in a separate task"""
     query = update.callback_query
+    sample_token = SAMPLE_TOKEN
+    
+    # Serve the prefetched sample entirely from memory when it is warm
+    if sample_token_info:
+        chain = sample_token_info['chain']
+        cached_file_id = fresh_sample_file_id() or BUBBLEMAP_FILEID.get((chain, normalize_address(sample_token)))
+        if cached_file_id:
+            await context.bot.send_photo(
+                chat_id=update.effective_chat.id,
+                photo=cached_file_id,
+                caption=format_token_info_message(sample_token_info, sample_metadata),
+                parse_mode="Markdown",
+                reply_markup=bubblemap_reply_markup(chain, sample_token)
+            )
+            return
     
-    # Use a common token for demonstration (Compound on ETH)
-    sample_token = '0xc00e94cb662c3520282e6f5717214004a7f26888'
-    
-    # Send status message
-    status_message = await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text='Fetching token information...'
+    chat_id = update.effective_chat.id
+    await send_bubblemap(
+        context,
+        chat_id,
+        sample_token,
+        send_status=lambda text: context.bot.send_message(chat_id=chat_id, text=text),
+        token_info=sample_token_info,
+        label="sample bubble map"
     )
+
+def fresh_sample_file_id():
+    """Return the sample bubble map's file_id if it is recent enough to reuse"""
+    if sample_file_id and time.monotonic() - sample_file_id_time < SAMPLE_FILE_ID_MAX_AGE:
+        return sample_file_id
+    return None
+
+async def refresh_sample_bubblemap(application: Application) -> None:
+    """Prefetch token info, metadata and the bubble map file_id for the sample token"""
+    global sample_token_info, sample_metadata
+    global sample_file_id, sample_file_id_time, sample_cache_message_id
+    token_info, error = await get_token_info(SAMPLE_TOKEN)
+    if error:
+        logger.error(f"Error prefetching sample token info: {error}")
+        return
     
-    # Get token information asynchronously
-    token_info, error = await get_token_info(sample_token)
+    chain = token_info['chain']
+    metadata, _ = await get_bubblemap_metadata(chain, SAMPLE_TOKEN)
+    sample_token_info = token_info
+    if metadata:
+        sample_metadata = metadata
     
-    if error:
-        await context.bot.edit_message_text(
-            chat_id=update.effective_chat.id,
-            message_id=status_message.message_id,
-            text=error
-        )
+    if fresh_sample_file_id():
         return
     
-    # Format token info message
-    token_info_message = await format_token_info_message(token_info)
+    # Adopt the file_id of a recent user request; BUBBLEMAP_FILEID entries are
+    # at most its TTL old, so count them as that old
+    file_id = BUBBLEMAP_FILEID.get((chain, normalize_address(SAMPLE_TOKEN)))
+    if file_id:
+        sample_file_id = file_id
+        sample_file_id_time = time.monotonic() - BUBBLEMAP_FILEID.ttl
+        return
     
-    # Update status message to indicate bubblemap generation
-    await context.bot.edit_message_text(
-        chat_id=update.effective_chat.id,
-        message_id=status_message.message_id,
-        text="Generating sample bubble map visualization..."
+    if not CACHE_CHAT_ID:
+        return
+    
+    # Upload a fresh map to the cache chat so users only ever get the file_id
+    image_data = await fetch_bubblemap_image(chain, SAMPLE_TOKEN)
+    photo_message = await application.bot.send_photo(
+        chat_id=CACHE_CHAT_ID,
+        photo=image_data,
+        disable_notification=True
     )
+    previous_message_id = sample_cache_message_id
+    sample_file_id = photo_message.photo[-1].file_id
+    sample_file_id_time = time.monotonic()
+    sample_cache_message_id = photo_message.message_id
     
-    try:
-        # Get chain from token info
-        chain = token_info['chain']
-        
-        # Request URL
-        request_url = f"{API_URL}/bubble-map?token={sample_token}&chain={chain}"
-        
-        # Make request to API asynchronously
-        global session
-        async with session.get(request_url) as response:
-            response.raise_for_status()
-            image_data = await response.read()
-        
-        # Create button to link to BubbleMaps website
-        bubblemap_url = f"https://app.bubblemaps.io/{chain}/token/{sample_token}"
-        keyboard = [[InlineKeyboardButton("🔍 Check on BubbleMaps", url=bubblemap_url)]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Send image to user with token info
-        await context.bot.send_photo(
-            chat_id=update.effective_chat.id,
-            photo=image_data,
-            caption=token_info_message,
-            parse_mode="Markdown",
-            reply_markup=reply_markup
-        )
-        
-        # Delete status message
-        await context.bot.delete_message(
-            chat_id=update.effective_chat.id,
-            message_id=status_message.message_id
-        )
-        
-    except aiohttp.ClientError as e:
-        logger.error(f"Error generating sample bubble map: {e}")
-        
-        # Extract error message from response
-        error_message = 'Error generating sample bubble map.\n\n'
-        
-        if hasattr(e, 'status') and e.status is not None:
-            try:
-                error_text = await e.text()
-                error_json = json.loads(error_text)
-                if 'error' in error_json:
-                    error_message = f"{error_json['error']}\n\n"
-            except (ValueError, KeyError, json.JSONDecodeError):
-                if hasattr(e, 'text') and len(e.text) < 200:
-                    error_message = f"{e.text}\n\n"
-        
-        # If bubble map couldn't be generated, just show token info
-        await context.bot.edit_message_text(
-            chat_id=update.effective_chat.id,
-            message_id=status_message.message_id,
-            text=f"{error_message}{token_info_message}",
-            parse_mode="Markdown"
-        )
+    # Remove the outdated upload from the cache chat
+    if previous_message_id is not None:
+        try:
+            await application.bot.delete_message(chat_id=CACHE_CHAT_ID, message_id=previous_message_id)
+        except TelegramError as e:
+            logger.warning(f"Could not delete previous sample upload: {e}")
+
+async def sample_refresh_loop(application: Application) -> None:
+    """Refresh the prefetched sample token data every SAMPLE_REFRESH_INTERVAL seconds"""
+    while True:
+        try:
+            await refresh_sample_bubblemap(application)
+        except Exception as e:
+            logger.error(f"Error refreshing sample bubble map: {e}")
+        await asyncio.sleep(SAMPLE_REFRESH_INTERVAL)
 
 async def on_shutdown(application: Application) -> None:
-    """Close aiohttp session when shutting down the application"""
+    """Stop background tasks and close aiohttp session when shutting down the application"""
     global session
+    if sample_refresh_task:
+        sample_refresh_task.cancel()
+        # Wait for the loop to stop before closing the session it uses
+        await asyncio.gather(sample_refresh_task, return_exceptions=True)
     if session:
         await session.close()
 
 def main() -> None:
     """Start the bot."""
+    # Use uvloop's faster event loop when it is available
+    try:
+        import uvloop
+        # Install the loop itself; run_polling picks it up via asyncio.get_event_loop()
+        asyncio.set_event_loop(uvloop.new_event_loop())
+    except ImportError:
+        pass
+    
     # Create Application instance
-    application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(on_shutdown)
+        .rate_limiter(AIORateLimiter(
+            overall_max_rate=RATE_LIMITER_MAX_RATE,
+            max_retries=RATE_LIMITER_MAX_RETRIES
+        ))
+        .build()
+    )
     
     # Add shutdown callback
     application.add_handler(CallbackQueryHandler(button_callback))
@@ -635,9 +878,6 @@ def main() -> None:
     # Register message handler - replace the unknown_text handler with the new handler
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_input))
     
-    # Register shutdown handler
-    application.shutdown = on_shutdown
-    
     # Start the Bot
     application.run_polling(allowed_updates=Update.ALL_TYPES)
     logger.info("Bot started in polling mode")